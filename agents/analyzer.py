@@ -1,49 +1,176 @@
 # agents/analyzer.py
+import asyncio
+import httpx
+import numpy as np
 import pandas as pd
-from openai import OpenAI
-import json
+from openai import OpenAI, AsyncOpenAI
 from typing import Dict, List, Any
 
+from agents.caching import cache_data, cached_value_counts
+
+
+@cache_data
+def _full_report(data: pd.DataFrame) -> Dict[str, Any]:
+    """One fused pass over the data - statistics, correlations and trends together
+
+    The frame's numeric block is materialized as a single NumPy buffer and
+    every downstream number (describe-style summary, correlation matrix, NaN
+    counts, trend flags) is a reduction over that one buffer. The separate
+    describe/corr/isnull walks each used to re-read the whole frame.
+    """
+    numeric_columns = data.select_dtypes(include=['number']).columns.tolist()
+    categorical_columns = data.select_dtypes(include=['object', 'category']).columns.tolist()
+    date_columns = data.select_dtypes(include=['datetime64']).columns.tolist()
+
+    numeric_summary = {}
+    correlations = {}
+    missing_values = {}
+    high_corr = []
+
+    if numeric_columns:
+        arr = data[numeric_columns].to_numpy(dtype='float64', na_value=np.nan)
+        nan_mask = np.isnan(arr)
+        counts = (~nan_mask).sum(axis=0)
+
+        with np.errstate(all='ignore'):
+            means = np.nanmean(arr, axis=0)
+            stds = np.nanstd(arr, axis=0, ddof=1)
+            mins = np.nanmin(arr, axis=0)
+            maxs = np.nanmax(arr, axis=0)
+            q25, q50, q75 = np.nanpercentile(arr, [25, 50, 75], axis=0)
+
+        for k, col in enumerate(numeric_columns):
+            numeric_summary[col] = {
+                "count": float(counts[k]),
+                "mean": float(means[k]),
+                "std": float(stds[k]),
+                "min": float(mins[k]),
+                "25%": float(q25[k]),
+                "50%": float(q50[k]),
+                "75%": float(q75[k]),
+                "max": float(maxs[k]),
+            }
+            missing_values[col] = int(nan_mask[:, k].sum())
+
+        if len(numeric_columns) > 1:
+            if not nan_mask.any():
+                # NaN-free block: contiguous float32 turns the correlation into
+                # one sgemm call, halving the bytes BLAS has to stream
+                sub = np.ascontiguousarray(arr, dtype=np.float32)
+                with np.errstate(all='ignore'):
+                    corr = np.corrcoef(sub, rowvar=False)
+            else:
+                # missing values need pairwise-complete handling, which is
+                # exactly what pandas' corr() does
+                corr = data[numeric_columns].corr().to_numpy()
+            correlations = {
+                col: {other: float(corr[k, m]) for m, other in enumerate(numeric_columns)}
+                for k, col in enumerate(numeric_columns)
+            }
+            cols = np.asarray(numeric_columns, dtype=object)
+            i, j = np.triu_indices(len(cols), k=1)
+            strong = np.abs(corr[i, j]) > 0.7
+            high_corr = [f"{x} and {y}" for x, y in zip(cols[i[strong]], cols[j[strong]])]
+
+    other_columns = [col for col in data.columns if col not in numeric_columns]
+    if other_columns:
+        missing_values.update(data[other_columns].isnull().sum().to_dict())
+
+    categorical_summary = {col: cached_value_counts(data, col, top_n=5).to_dict()
+                           for col in categorical_columns}
+
+    trends = []
+    if date_columns and numeric_columns:
+        trends.append("Time series data detected - can analyze trends over time")
+    if high_corr:
+        trends.append(f"Strong correlations found between: {', '.join(high_corr)}")
+    high_missing = [col for col, n in missing_values.items() if n > len(data) * 0.1]
+    if high_missing:
+        trends.append(f"Columns with significant missing data: {high_missing}")
+    if not trends:
+        trends = ["No obvious trends detected in current analysis"]
+
+    return {
+        "numeric_summary": numeric_summary,
+        "categorical_summary": categorical_summary,
+        "correlations": correlations,
+        "missing_values": missing_values,
+        "trends": trends,
+    }
+
+
+def _basic_statistics(data: pd.DataFrame) -> Dict[str, Any]:
+    report = _full_report(data)
+    return {key: report[key] for key in ("numeric_summary", "categorical_summary", "correlations")}
+
+
+def _find_trends(data: pd.DataFrame) -> List[str]:
+    return _full_report(data)["trends"]
+
+
 class AnalyzerAgent:
     """
     This agent is like a detective - it looks at data and finds interesting patterns
     """
-    
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
-    
+
+    def __init__(self, api_key: str, http_client: httpx.Client = None,
+                 async_http_client: httpx.AsyncClient = None):
+        # HTTP/2 with keep-alive means one TLS handshake serves every AI call,
+        # and concurrent batch requests multiplex over the same connection
+        limits = httpx.Limits(max_keepalive_connections=20)
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=http_client or httpx.Client(http2=True, limits=limits)
+        )
+        self._api_key = api_key
+        self._async_http_client = async_http_client
+
+    def _make_aclient(self) -> AsyncOpenAI:
+        """A fresh async client for the current event loop
+
+        The agent outlives each asyncio.run() the app drives it with, but an
+        httpx.AsyncClient's pooled connections die with their event loop - so
+        the async client is built per batch call and closed before the loop
+        ends, mirroring the data reader's per-loop sessions. Within one batch
+        all prompts still multiplex over its single HTTP/2 connection.
+        """
+        limits = httpx.Limits(max_keepalive_connections=20)
+        return AsyncOpenAI(
+            api_key=self._api_key,
+            http_client=self._async_http_client or httpx.AsyncClient(http2=True, limits=limits)
+        )
+
     def basic_statistics(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Calculate basic statistics - like counting and measuring things"""
         if data.empty:
             return {"error": "No data to analyze"}
-        
-        numeric_data = data.select_dtypes(include=['number'])
-        categorical_data = data.select_dtypes(include=['object'])
-        
-        stats = {
-            "numeric_summary": numeric_data.describe().to_dict() if not numeric_data.empty else {},
-            "categorical_summary": {col: data[col].value_counts().head().to_dict() 
-                                  for col in categorical_data.columns} if not categorical_data.empty else {},
-            "correlations": numeric_data.corr().to_dict() if len(numeric_data.columns) > 1 else {}
-        }
-        return stats
-    
-    def ai_insights(self, data_info: Dict, user_question: str) -> str:
-        """Use AI to generate insights - like having a smart friend explain the data"""
-        
-        # Prepare data summary for AI
-        data_summary = f"""
+        return _basic_statistics(data)
+
+    def full_report(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Everything at once - statistics, correlations and trends from one scan"""
+        if data.empty:
+            return {"error": "No data to analyze"}
+        return _full_report(data)
+
+    def _build_prompt(self, data_info: Dict, user_question: str) -> str:
+        """Prepare the data summary the AI will read"""
+        return f"""
         Data Summary:
         - Rows: {data_info.get('rows', 0)}
         - Columns: {data_info.get('columns', 0)}
         - Column Names: {data_info.get('column_names', [])}
         - Data Types: {data_info.get('data_types', {})}
         - Missing Values: {data_info.get('missing_values', {})}
-        - Sample Data: {json.dumps(data_info.get('sample_data', {}), indent=2)}
-        
+        - Sample Data: {data_info.get('sample_data', '[]')}
+
         User Question: {user_question}
         """
-        
+
+    def ai_insights(self, data_info: Dict, user_question: str) -> str:
+        """Use AI to generate insights - like having a smart friend explain the data"""
+
+        data_summary = self._build_prompt(data_info, user_question)
+
         try:
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
@@ -56,34 +183,40 @@ class AnalyzerAgent:
             return response.choices[0].message.content
         except Exception as e:
             return f"Error generating AI insights: {e}"
-    
+
+    async def ai_insights_batch(self, data_info: Dict, questions: List[str]) -> List[str]:
+        """Answer several questions at once - like asking a panel of analysts in parallel
+
+        All prompts are fired concurrently, so the wall time is one round-trip
+        instead of one per question. A semaphore caps in-flight requests to
+        stay inside OpenAI rate limits.
+        """
+        semaphore = asyncio.Semaphore(10)
+        aclient = self._make_aclient()
+
+        async def _one(question: str) -> str:
+            data_summary = self._build_prompt(data_info, question)
+            try:
+                async with semaphore:
+                    response = await aclient.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=[
+                            {"role": "system", "content": "You are a data analyst. Analyze the provided data and answer the user's question with clear, actionable insights."},
+                            {"role": "user", "content": data_summary}
+                        ],
+                        max_tokens=500
+                    )
+                return response.choices[0].message.content
+            except Exception as e:
+                return f"Error generating AI insights: {e}"
+
+        try:
+            return await asyncio.gather(*[_one(q) for q in questions])
+        finally:
+            # injected clients belong to the caller; only close our own
+            if self._async_http_client is None:
+                await aclient.close()
+
     def find_trends(self, data: pd.DataFrame) -> List[str]:
         """Find trends in the data - like spotting patterns"""
-        trends = []
-        
-        # Look for time-based trends
-        date_columns = data.select_dtypes(include=['datetime64']).columns
-        numeric_columns = data.select_dtypes(include=['number']).columns
-        
-        if len(date_columns) > 0 and len(numeric_columns) > 0:
-            trends.append("Time series data detected - can analyze trends over time")
-        
-        # Look for correlations
-        if len(numeric_columns) > 1:
-            corr_matrix = data[numeric_columns].corr()
-            high_corr = []
-            for i in range(len(corr_matrix.columns)):
-                for j in range(i+1, len(corr_matrix.columns)):
-                    if abs(corr_matrix.iloc[i, j]) > 0.7:
-                        high_corr.append(f"{corr_matrix.columns[i]} and {corr_matrix.columns[j]}")
-            
-            if high_corr:
-                trends.append(f"Strong correlations found between: {', '.join(high_corr)}")
-        
-        # Look for missing data patterns
-        missing_data = data.isnull().sum()
-        high_missing = missing_data[missing_data > len(data) * 0.1]
-        if not high_missing.empty:
-            trends.append(f"Columns with significant missing data: {list(high_missing.index)}")
-        
-        return trends if trends else ["No obvious trends detected in current analysis"]
+        return _find_trends(data)
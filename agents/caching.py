@@ -0,0 +1,66 @@
+# agents/caching.py
+"""
+Shared caching helpers - like the library's card catalog, so the agents
+never do the same expensive lookup twice
+"""
+import hashlib
+import pickle
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def df_hash(data: pd.DataFrame) -> str:
+    """Stable content-based key for a DataFrame
+
+    hash_pandas_object rejects unhashable cells (lists/dicts), which frames
+    built from nested API JSON routinely contain - fall back to hashing the
+    pickled bytes so those frames stay cacheable instead of crashing.
+    """
+    try:
+        return hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values).hexdigest()
+    except TypeError:
+        return hashlib.sha1(pickle.dumps(data)).hexdigest()
+
+
+# Tell st.cache_data how to key on DataFrames (they are not hashable by default)
+DF_HASH_FUNCS = {pd.DataFrame: df_hash}
+
+
+def cache_data(func):
+    """st.cache_data preconfigured with the DataFrame hasher"""
+    return st.cache_data(show_spinner=False, hash_funcs=DF_HASH_FUNCS)(func)
+
+
+@cache_data
+def null_count(data: pd.DataFrame) -> int:
+    """Total missing cells, counted in one pass over a single boolean mask
+
+    isnull().sum().sum() reduces per column and then across the resulting
+    Series; counting non-zeros on the raw ndarray does it in one sweep.
+    """
+    return int(np.count_nonzero(data.isna().to_numpy()))
+
+
+def cached_value_counts(data: pd.DataFrame, column: str, top_n: int = None) -> pd.Series:
+    """value_counts computed once per column and stashed on the frame itself
+
+    The counts ride along in df.attrs, so every chart or summary that needs
+    the same column skips the O(rows) group-by hashing after the first call.
+    Counts are stored unsorted; asking for top_n does an O(k log n) partial
+    selection via nlargest instead of sorting the whole cardinality space,
+    and category columns are counted with a straight np.bincount.
+    """
+    cache = data.attrs.setdefault('_vc_cache', {})
+    if column not in cache:
+        series = data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+            cache[column] = pd.Series(counts, index=series.cat.categories)
+        else:
+            cache[column] = series.value_counts(sort=False, dropna=True)
+    counts = cache[column]
+    if top_n is not None:
+        return counts.nlargest(top_n)
+    return counts.sort_values(ascending=False)
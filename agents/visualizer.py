@@ -2,9 +2,119 @@
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
+import streamlit as st
 from typing import List, Dict, Any
 
+from agents.caching import cached_value_counts, df_hash
+
+
+@st.cache_resource(show_spinner=False)
+def _auto_visualize(_data: pd.DataFrame, data_key: str, max_charts: int,
+                    color_palette: tuple) -> List[go.Figure]:
+    """Cached chart builder - figures are only reconstructed when the data changes
+
+    Plotly figure construction pays schema validation and serialization in
+    Python; keying on a cheap sample-based hash lets Streamlit reruns reuse
+    the same figure objects. `_data` is underscored so Streamlit keys on
+    (data_key, max_charts) instead of trying to hash the frame.
+    """
+    data = _data
+    color_palette = list(color_palette)
+    charts = []
+    numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
+    categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+    date_cols = data.select_dtypes(include=['datetime64']).columns.tolist()
+
+    chart_count = 0
+
+    # 1. Bar chart for categorical data
+    if categorical_cols and chart_count < max_charts:
+        col = categorical_cols[0]
+        value_counts = cached_value_counts(data, col, top_n=10)
+        fig = px.bar(
+            x=value_counts.index,
+            y=value_counts.values,
+            title=f'Distribution of {col}',
+            color_discrete_sequence=color_palette
+        )
+        charts.append(fig)
+        chart_count += 1
+
+    # 2. Histogram for numeric data
+    if numeric_cols and chart_count < max_charts:
+        col = numeric_cols[0]
+        fig = px.histogram(
+            data,
+            x=col,
+            title=f'Distribution of {col}',
+            color_discrete_sequence=color_palette
+        )
+        charts.append(fig)
+        chart_count += 1
+
+    # 3. Scatter plot if we have 2+ numeric columns
+    if len(numeric_cols) >= 2 and chart_count < max_charts:
+        fig = px.scatter(
+            data,
+            x=numeric_cols[0],
+            y=numeric_cols[1],
+            title=f'{numeric_cols[0]} vs {numeric_cols[1]}',
+            color_discrete_sequence=color_palette
+        )
+        charts.append(fig)
+        chart_count += 1
+
+    # 4. Line chart if we have date column
+    if date_cols and numeric_cols and chart_count < max_charts:
+        fig = px.line(
+            data,
+            x=date_cols[0],
+            y=numeric_cols[0],
+            title=f'{numeric_cols[0]} over time',
+            color_discrete_sequence=color_palette
+        )
+        charts.append(fig)
+        chart_count += 1
+
+    # 5. Correlation heatmap
+    if len(numeric_cols) > 2 and chart_count < max_charts:
+        arr = data[numeric_cols].to_numpy(dtype=np.float32, na_value=np.nan)
+        if not np.isnan(arr).any():
+            # NaN-free numeric block: one BLAS sgemm instead of pandas'
+            # per-column-pair nancorr loop
+            corr_matrix = pd.DataFrame(np.corrcoef(arr, rowvar=False),
+                                       index=numeric_cols, columns=numeric_cols)
+        else:
+            corr_matrix = data[numeric_cols].corr()
+        fig = px.imshow(
+            corr_matrix,
+            title='Correlation Heatmap',
+            color_continuous_scale='RdBu'
+        )
+        charts.append(fig)
+        chart_count += 1
+
+    return charts
+
+@st.cache_resource(show_spinner=False)
+def _custom_chart(_visualizer, _data: pd.DataFrame, data_key: str, chart_type: str,
+                  x_col: str, y_col: str) -> go.Figure:
+    """Cached custom-chart builder - unchanged inputs reuse the same figure
+
+    Keyed on (data_key, chart_type, x_col, y_col); the underscored arguments
+    are excluded from hashing, mirroring _auto_visualize.
+    """
+    builder = VisualizerAgent._chart_builders.get(chart_type, VisualizerAgent._bar_chart)
+    fig = builder(_visualizer, _data, x_col, y_col)
+    fig.update_layout(
+        title=f'{chart_type.title()} Chart: {x_col}' + (f' vs {y_col}' if y_col else ''),
+        template='plotly_white'
+    )
+    return fig
+
+
 class VisualizerAgent:
     """
     This agent is like an artist - it turns numbers into beautiful pictures
@@ -17,110 +127,42 @@ class VisualizerAgent:
         """Automatically create charts based on data types - like an artist choosing the best way to paint"""
         if data.empty:
             return []
-        
-        charts = []
-        numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = data.select_dtypes(include=['object']).columns.tolist()
-        date_cols = data.select_dtypes(include=['datetime64']).columns.tolist()
-        
-        chart_count = 0
-        
-        # 1. Bar chart for categorical data
-        if categorical_cols and chart_count < max_charts:
-            col = categorical_cols[0]
-            value_counts = data[col].value_counts().head(10)
-            fig = px.bar(
-                x=value_counts.index, 
-                y=value_counts.values,
-                title=f'Distribution of {col}',
-                color_discrete_sequence=self.color_palette
-            )
-            charts.append(fig)
-            chart_count += 1
-        
-        # 2. Histogram for numeric data
-        if numeric_cols and chart_count < max_charts:
-            col = numeric_cols[0]
-            fig = px.histogram(
-                data, 
-                x=col, 
-                title=f'Distribution of {col}',
-                color_discrete_sequence=self.color_palette
-            )
-            charts.append(fig)
-            chart_count += 1
-        
-        # 3. Scatter plot if we have 2+ numeric columns
-        if len(numeric_cols) >= 2 and chart_count < max_charts:
-            fig = px.scatter(
-                data, 
-                x=numeric_cols[0], 
-                y=numeric_cols[1],
-                title=f'{numeric_cols[0]} vs {numeric_cols[1]}',
-                color_discrete_sequence=self.color_palette
-            )
-            charts.append(fig)
-            chart_count += 1
-        
-        # 4. Line chart if we have date column
-        if date_cols and numeric_cols and chart_count < max_charts:
-            fig = px.line(
-                data, 
-                x=date_cols[0], 
-                y=numeric_cols[0],
-                title=f'{numeric_cols[0]} over time',
-                color_discrete_sequence=self.color_palette
-            )
-            charts.append(fig)
-            chart_count += 1
-        
-        # 5. Correlation heatmap
-        if len(numeric_cols) > 2 and chart_count < max_charts:
-            corr_matrix = data[numeric_cols].corr()
-            fig = px.imshow(
-                corr_matrix,
-                title='Correlation Heatmap',
-                color_continuous_scale='RdBu'
-            )
-            charts.append(fig)
-            chart_count += 1
-        
-        return charts
+        # sample-based hash keeps keying cheap even on tall frames
+        data_key = df_hash(data.head(1000))
+        return _auto_visualize(data, data_key, max_charts, tuple(self.color_palette))
     
+    def _bar_chart(self, data: pd.DataFrame, x_col: str, y_col: str) -> go.Figure:
+        if y_col:
+            return px.bar(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
+        value_counts = cached_value_counts(data, x_col)
+        return px.bar(x=value_counts.index, y=value_counts.values, color_discrete_sequence=self.color_palette)
+
+    def _line_chart(self, data: pd.DataFrame, x_col: str, y_col: str) -> go.Figure:
+        return px.line(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
+
+    def _scatter_chart(self, data: pd.DataFrame, x_col: str, y_col: str) -> go.Figure:
+        return px.scatter(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
+
+    def _histogram_chart(self, data: pd.DataFrame, x_col: str, y_col: str) -> go.Figure:
+        return px.histogram(data, x=x_col, color_discrete_sequence=self.color_palette)
+
+    # one dict lookup instead of an if/elif chain; unknown types fall back to bar
+    _chart_builders = {
+        'bar': _bar_chart,
+        'line': _line_chart,
+        'scatter': _scatter_chart,
+        'histogram': _histogram_chart,
+    }
+
     def create_custom_chart(self, data: pd.DataFrame, chart_type: str, x_col: str, y_col: str = None) -> go.Figure:
         """Create specific chart type - like asking the artist for a specific style of painting"""
-        
-        if chart_type == 'bar':
-            if y_col:
-                fig = px.bar(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
-            else:
-                value_counts = data[x_col].value_counts()
-                fig = px.bar(x=value_counts.index, y=value_counts.values, color_discrete_sequence=self.color_palette)
-        
-        elif chart_type == 'line':
-            fig = px.line(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
-        
-        elif chart_type == 'scatter':
-            fig = px.scatter(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
-        
-        elif chart_type == 'histogram':
-            fig = px.histogram(data, x=x_col, color_discrete_sequence=self.color_palette)
-        
-        else:
-            # Default to bar chart
-            fig = px.bar(data, x=x_col, y=y_col, color_discrete_sequence=self.color_palette)
-        
-        fig.update_layout(
-            title=f'{chart_type.title()} Chart: {x_col}' + (f' vs {y_col}' if y_col else ''),
-            template='plotly_white'
-        )
-        
-        return fig
+        data_key = df_hash(data.head(1000))
+        return _custom_chart(self, data, data_key, chart_type, x_col, y_col)
     
     def create_dashboard(self, data: pd.DataFrame) -> go.Figure:
         """Create a dashboard with multiple charts - like creating a gallery of paintings"""
         numeric_cols = data.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = data.select_dtypes(include=['object']).columns.tolist()
+        categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
         
         # Create subplots
         fig = make_subplots(
@@ -142,7 +184,7 @@ class VisualizerAgent:
         if categorical_cols:
             # Category distribution
             col = categorical_cols[0]
-            value_counts = data[col].value_counts().head(5)
+            value_counts = cached_value_counts(data, col, top_n=5)
             fig.add_trace(
                 go.Pie(labels=value_counts.index, values=value_counts.values, name="Distribution"),
                 row=1, col=2
@@ -1,8 +1,10 @@
+import asyncio
 import streamlit as st
 import pandas as pd
 from agents.data_reader import DataReaderAgent
 from agents.analyzer import AnalyzerAgent
 from agents.visualizer import VisualizerAgent
+from agents.caching import null_count
 import os
 
 # Configure the page
@@ -18,6 +20,11 @@ if 'data' not in st.session_state:
 if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
 
+@st.cache_resource
+def get_analyzer(api_key: str) -> AnalyzerAgent:
+    """One AnalyzerAgent per API key - keeps the pooled HTTP clients alive across reruns"""
+    return AnalyzerAgent(api_key)
+
 def main():
     st.title("🤖 Multi-Source Data Analysis Agent")
     st.markdown("### Your AI-powered data analysis companion!")
@@ -32,7 +39,7 @@ def main():
     # Initialize agents
     reader_agent = DataReaderAgent()
     if api_key:
-        analyzer_agent = AnalyzerAgent(api_key)
+        analyzer_agent = get_analyzer(api_key)
     visualizer_agent = VisualizerAgent()
     
     # Main interface
@@ -53,9 +60,9 @@ def main():
             
             if uploaded_file:
                 if uploaded_file.name.endswith('.csv'):
-                    data = reader_agent.read_csv(uploaded_file)
+                    data = asyncio.run(reader_agent.read_csv(uploaded_file))
                 else:
-                    data = reader_agent.read_excel(uploaded_file)
+                    data = asyncio.run(reader_agent.read_excel(uploaded_file))
                 
                 if not data.empty:
                     st.session_state.data = data
@@ -66,7 +73,7 @@ def main():
             st.subheader("🌐 API Data")
             api_url = st.text_input("Enter API URL (optional)")
             if st.button("Fetch API Data") and api_url:
-                data = reader_agent.read_api(api_url)
+                data = asyncio.run(reader_agent.read_api(api_url))
                 if not data.empty:
                     st.session_state.data = data
                     st.success(f"✅ Loaded {len(data)} rows from API")
@@ -100,7 +107,7 @@ def main():
             with col2:
                 st.metric("Total Columns", len(data.columns))
             with col3:
-                st.metric("Missing Values", data.isnull().sum().sum())
+                st.metric("Missing Values", null_count(data))
             
             # Data info
             st.subheader("📋 Data Overview")
@@ -119,16 +126,13 @@ def main():
             with col2:
                 st.write("**Basic Statistics:**")
                 if api_key:
-                    basic_stats = analyzer_agent.basic_statistics(data)
-                    if basic_stats.get('numeric_summary'):
+                    report = analyzer_agent.full_report(data)
+                    if report.get('numeric_summary'):
                         st.write("Numeric columns summary:")
-                        st.json(basic_stats['numeric_summary'])
-                
-                # Find trends
-                if api_key:
-                    trends = analyzer_agent.find_trends(data)
+                        st.json(report['numeric_summary'])
+
                     st.write("**Detected Patterns:**")
-                    for trend in trends:
+                    for trend in report.get('trends', []):
                         st.write(f"• {trend}")
     
     with tab3:
@@ -200,11 +204,13 @@ def main():
                 "What recommendations do you have?"
             ]
             
-            for question in quick_questions:
-                if st.button(question):
-                    with st.spinner("Analyzing..."):
-                        data_info = reader_agent.get_data_info(st.session_state.data)
-                        insights = analyzer_agent.ai_insights(data_info, question)
+            if st.button("Run Quick Analysis"):
+                with st.spinner("Analyzing..."):
+                    data_info = reader_agent.get_data_info(st.session_state.data)
+                    results = asyncio.run(
+                        analyzer_agent.ai_insights_batch(data_info, quick_questions)
+                    )
+                    for question, insights in zip(quick_questions, results):
                         st.write(f"**{question}**")
                         st.write(insights)
     